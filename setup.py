@@ -43,6 +43,9 @@ setup(
         'formats',
     ],
     extras_require={
+        'http2': [
+            'httpx[http2]',
+        ],
         'dev': [
             'pytest>=3',
             'httpretty',
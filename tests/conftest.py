@@ -41,6 +41,22 @@ httpretty.register_uri(
     ]
 )
 
+# endpoints that first fail and then succeed, to test negative caching
+httpretty.register_uri(
+    httpretty.GET, API_URL + '/negative_cache',
+    responses=[
+        httpretty.Response(body='', status=404),
+        httpretty.Response(body='"the found response"'),
+    ]
+)
+httpretty.register_uri(
+    httpretty.GET, API_URL + '/empty_cache',
+    responses=[
+        httpretty.Response(body=''),
+        httpretty.Response(body='"the filled response"'),
+    ]
+)
+
 
 @pytest.fixture(scope='session')
 def endpoints():
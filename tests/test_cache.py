@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import tortilla
+from tortilla.cache import DictCache, TieredCache
+
+from conftest import API_URL
+
+
+def test_tiered_cache_read_through():
+    shared = DictCache()
+    cache = TieredCache(shared, maxsize=2)
+
+    shared.set('a', 1)
+    assert cache.get('a') == 1
+    shared.delete('a')
+    assert cache.get('a') == 1
+
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert shared.get('c') == 3
+    assert cache.get('a') is None
+
+
+def test_tiered_cache_lifetime():
+    shared = DictCache()
+    cache = TieredCache(shared, lifetime=0.1)
+
+    cache.set('a', 1)
+    cache.set('b', {'value': 2, 'expires_on': time.time()})
+    shared.clear()
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_tiered_cache_response(endpoints):
+    api = tortilla.wrap(API_URL, cache=TieredCache(DictCache()))
+    assert api.test.get(cache_lifetime=100) == endpoints['/test']['body']
+    assert api.test.get() == endpoints['/test']['body']
+
+
+class FakePubSub(object):
+    def __init__(self, redis):
+        self.redis = redis
+
+    def subscribe(self, **handlers):
+        self.redis.handlers.extend(handlers.values())
+
+    def run_in_thread(self, **kwargs):
+        return None
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.handlers = []
+        self.published = []
+
+    def pubsub(self, **kwargs):
+        return FakePubSub(self)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        for handler in self.handlers:
+            handler({'channel': channel, 'data': message})
+
+
+def test_tiered_cache_invalidation():
+    redis = FakeRedis()
+    shared = DictCache()
+    sender = TieredCache(shared, redis=redis)
+    receiver = TieredCache(shared, redis=redis)
+
+    sender.set('a', 1)
+    assert receiver.get('a') == 1
+    sender.set('a', 2)
+    assert len(redis.published) == 2
+    assert redis.published[-1][0] == sender.channel
+    # the sender keeps its own copy, the receiver reads the new value
+    assert sender._local_get('"a"') == 2
+    assert receiver._local_get('"a"') is None
+    assert receiver.get('a') == 2
+
+    sender.clear()
+    assert receiver._local_get('"a"') is None
+    assert receiver.get('a') is None
+
+
+def test_tiered_cache_fork():
+    redis = FakeRedis()
+    shared = DictCache()
+    parent = TieredCache(shared, redis=redis)
+    cache = TieredCache(shared, redis=redis)
+    cache.set('a', 1)
+    parent_id = cache._id
+
+    # simulates the cache being used in a forked child process
+    cache._pid -= 1
+    assert cache.get('a') == 1
+    assert len(redis.handlers) == 3
+    assert cache._id != parent_id
+
+    # the child is told about changes made by the parent
+    parent.set('a', 2)
+    assert cache._local_get('"a"') is None
+    assert cache.get('a') == 2
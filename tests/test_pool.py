@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import tortilla
+from tortilla.pool import ClientPool, default_pool
+
+from conftest import API_URL
+
+
+def test_shared_clients():
+    pool = ClientPool()
+    users = tortilla.wrap(API_URL + '/users', pool=pool)
+    teams = tortilla.wrap(API_URL + '/teams', pool=pool)
+    other = tortilla.wrap('http://other.tortilla.locally', pool=pool)
+    debug = tortilla.wrap(API_URL, pool=pool, debug=True)
+    proxied = tortilla.wrap(API_URL, pool=pool,
+                            proxies={'http': 'http://proxy.locally'})
+    same_proxy = tortilla.wrap(API_URL, pool=pool,
+                               proxies={'http': 'http://proxy.locally'})
+
+    assert users._parent is teams._parent
+    assert users._parent is not other._parent
+    assert users._parent is not debug._parent
+    assert proxied._parent is same_proxy._parent
+    assert len(pool.clients()) == 4
+
+    assert pool.close(timeout=1)
+    assert pool.clients() == []
+
+
+def test_pool_close_timeout():
+    pool = ClientPool()
+    clients = [pool.client(API_URL, debug=debug) for debug in (False, True)]
+    for client in clients:
+        # requests in progress that don't finish
+        client._active_requests += 1
+
+    start = time.time()
+    assert not pool.close(timeout=0.2)
+    # the timeout is shared by all clients
+    assert time.time() - start < 0.35
+
+
+def test_default_pool():
+    api = tortilla.wrap(API_URL, pool=True)
+    assert api._parent in default_pool.clients()
+
+
+def test_session_after_fork(endpoints):
+    api = tortilla.wrap(API_URL, pool=ClientPool())
+    client = api._parent
+    session = client.session
+
+    # another thread of the parent holds the lock during the fork
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with client._activity:
+            client._active_requests += 1
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    locked.wait()
+
+    # pretend the client was created in a parent process
+    client._pid -= 1
+    try:
+        assert api.test.get() == endpoints['/test']['body']
+        assert client.session is not session
+        assert client.close(timeout=1)
+    finally:
+        release.set()
+        thread.join()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import six
+
+import tortilla
+from tortilla.tracing import Tracer
+
+from conftest import API_URL
+
+
+def test_tracer(endpoints):
+    tracer = Tracer(slowest=2)
+    api = tortilla.wrap(API_URL, tracer=tracer)
+    api.test.get()
+    api.user.get('jimmy', delay=0.05)
+    api.get('config')
+
+    traces = tracer.slowest()
+    assert len(traces) == 2
+    assert traces[0].duration >= traces[1].duration
+    assert 'network' in traces[0].phases()
+    assert 'parse' in traces[0].phases()
+    assert traces[0].status_code == 200
+
+    fp = six.StringIO()
+    tracer.export(fp)
+    events = json.loads(fp.getvalue())['traceEvents']
+    assert API_URL + '/user/jimmy' in [event['name'][4:] for event in events]
+
+
+def test_tracer_sampling(endpoints):
+    tracer = Tracer(sample_rate=0.0)
+    api = tortilla.wrap(API_URL, tracer=tracer)
+    api.test.get()
+    assert tracer.slowest() == []
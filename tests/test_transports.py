@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from requests.exceptions import HTTPError, ReadTimeout
+
+import tortilla
+from tortilla.transports import HTTP2Session, to_requests_response
+
+from conftest import API_URL
+
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('h2')
+
+
+def test_http2_session():
+    api = tortilla.wrap(API_URL, http2=True, verify=False)
+    session = api._parent.session
+    assert isinstance(session, HTTP2Session)
+    assert session.verify is False
+
+
+def test_http2_response():
+    request = httpx.Request('GET', API_URL + '/status_404')
+    response = to_requests_response(
+        httpx.Response(404, content=b'{"message": "Not found"}',
+                       request=request))
+    assert response.json() == {'message': 'Not found'}
+    assert response.url == API_URL + '/status_404'
+    with pytest.raises(HTTPError):
+        response.raise_for_status()
+
+
+def echo(request):
+    if request.url.path == '/missing':
+        return httpx.Response(404, json={'message': 'Not found'})
+    return httpx.Response(200, json={
+        'method': request.method,
+        'query': dict(request.url.params),
+        'body': json.loads(request.content.decode('utf-8') or 'null'),
+        'timeout': request.extensions['timeout'],
+    })
+
+
+def test_http2_round_trip():
+    api = tortilla.wrap(API_URL, http2=True)
+    api._parent.session = HTTP2Session(transport=httpx.MockTransport(echo))
+
+    response = api.things.post(data={'a': 1}, params={'q': 'x'})
+    assert response.method == 'POST'
+    assert response.query == {'q': 'x'}
+    assert response.body == {'a': 1}
+    assert set(response.timeout.values()) == {None}
+
+    assert api.missing.get(silent=True).message == 'Not found'
+    with pytest.raises(HTTPError):
+        api.missing.get()
+    with pytest.raises(ValueError):
+        api.things.get(proxies={'https': 'http://proxy.locally'})
+
+
+def test_http2_read_timeout():
+    requests = []
+
+    def timeout(request):
+        requests.append(request)
+        raise httpx.ReadTimeout('timed out', request=request)
+
+    api = tortilla.wrap(API_URL, http2=True)
+    api._parent.session = HTTP2Session(
+        transport=httpx.MockTransport(timeout))
+    with pytest.raises(ReadTimeout):
+        api.things.post(data={'a': 1}, timeout=1)
+    # timeouts aren't retried like lost connections
+    assert len(requests) == 1
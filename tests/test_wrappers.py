@@ -2,12 +2,21 @@
 
 from __future__ import unicode_literals
 
-import time 
+import array
+import io
+import threading
+import time
+from collections import namedtuple
+
+import httpretty
 
 import pytest
 from requests.exceptions import HTTPError
 
-from tortilla.utils import Bunch, bunchify, run_from_ipython
+from tortilla import utils, wrappers
+from tortilla.batching import batch
+from tortilla.utils import Bunch, bunchify, columnize, modelify, \
+    run_from_ipython
 
 
 def time_function(fn, *args, **kwargs):
@@ -39,6 +48,27 @@ def test_cached_response(api):
     assert api.cache.get() == "the second response"
 
 
+def test_cached_negative_response(api):
+    with pytest.raises(HTTPError):
+        api.negative_cache.get(error_cache_lifetime={'4xx': 100})
+    with pytest.raises(HTTPError):
+        api.negative_cache.get()
+    assert api.negative_cache.get(silent=True) is None
+    assert api.negative_cache.get(ignore_cache=True) == "the found response"
+
+    api.empty_cache(error_cache_lifetime={'empty': 100})
+    assert api.empty_cache.get() is None
+    assert api.empty_cache.get() is None
+    assert api.empty_cache.get(ignore_cache=True) == "the filled response"
+
+
+def test_error_cache_lifetime_override(api):
+    api.status_404(error_cache_lifetime={404: 60})
+    with pytest.raises(HTTPError):
+        api.status_404.get(error_cache_lifetime=10)
+    assert api.status_404.get(error_cache_lifetime=0, silent=True) is None
+
+
 def test_request_delay(api):
     api.config.delay = 0.2
     assert time_function(api.test.get) >= 0.2
@@ -54,6 +84,60 @@ def test_request_methods(api):
     assert api.head_endpoint.head() is None
 
 
+def test_streamed_response(api, endpoints):
+    body = endpoints['/nojson']['body'].encode('utf-8')
+    assert api.nojson.get(raw=True) == body
+
+    sink = io.BytesIO()
+    progress = []
+    stats = api.nojson.get(sink=sink, progress=lambda *args:
+                           progress.append(args))
+    assert sink.getvalue() == body
+    assert stats.bytes == len(body)
+    assert progress[-1] == (len(body), len(body))
+
+
+def test_streamed_request(api):
+    progress = []
+    data = io.BytesIO(b'streamed data')
+    assert api.post_endpoint.post(data=data, progress=lambda *args:
+                                  progress.append(args)).message == \
+        "Success!"
+    assert progress[-1] == (13, 13)
+    assert httpretty.last_request().headers['Content-Length'] == '13'
+    assert httpretty.last_request().body == b'streamed data'
+
+    data = memoryview(b'streamed memory')
+    assert api.post_endpoint.post(data=data).message == "Success!"
+    assert httpretty.last_request().body == b'streamed memory'
+
+    data = memoryview(array.array('H', [1, 2]))
+    assert api.post_endpoint.post(data=data).message == "Success!"
+    assert httpretty.last_request().headers['Content-Length'] == '4'
+    assert httpretty.last_request().body == data.tobytes()
+
+
+def test_streamed_request_retry(api, endpoints):
+    session = api._parent.session
+    request = session.request
+    sent = []
+
+    def reset_once(*args, **kwargs):
+        if not sent:
+            sent.append(b''.join(kwargs['data']))
+            raise wrappers.ConnectionError()
+        return request(*args, **kwargs)
+
+    session.request = reset_once
+    assert api.post_endpoint.post(data=io.BytesIO(b'payload')).message == \
+        "Success!"
+    assert httpretty.last_request().body == b'payload'
+
+    del sent[:]
+    with pytest.raises(wrappers.ConnectionError):
+        api.post_endpoint.post(data=(chunk for chunk in [b'pay', b'load']))
+
+
 def test_extensions(api):
     assert api.extension.hello.get(extension='json').message == "Success!"
     assert api.extension.hello.get(extension='.json').message == "Success!"
@@ -94,11 +178,157 @@ def test_response_exceptions(api):
     api.status_500.get(silent=True)
 
 
+def test_batched_requests(api, endpoints):
+    batch(api.users, param='names', key='name', window=0.1)
+    names = ['Jimmy', 'имя', 'Jimmy', 'nobody']
+    results = {}
+
+    def load(index, name):
+        results[index] = api.users(name).get()
+
+    threads = [threading.Thread(target=load, args=(index, name))
+               for index, name in enumerate(names)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    users = endpoints['/users']['body']
+    assert [results[index] for index in range(4)] == \
+        [users[0], users[1], users[0], None]
+    query = httpretty.last_request().querystring
+    assert sorted(query['names'][0].split(',')) == \
+        sorted(['Jimmy', 'имя', 'nobody'])
+
+
+def test_batched_request_failure(api):
+    batch(api.users, param='names', key='id', window=0.1)
+    errors = []
+
+    def load(name):
+        try:
+            api.users(name).get()
+        except KeyError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(name,))
+               for name in ['Jimmy', 'имя']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert len(errors) == 2
+
+
+def test_batch_endpoint(api):
+    assert api.batch.url() == api.url() + '/batch'
+
+
 def test_bunchify():
     bunch = bunchify([{'a': 1}, {'b': 2}])
     assert isinstance(bunch[0], Bunch)
 
 
+class SlottedUser(object):
+    __slots__ = ('name', 'age')
+
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+
+def test_modelify():
+    User = namedtuple('User', ['name', 'age'])
+    users = modelify([{'name': 'Jimmy', 'age': 10, 'interest': 'Games'}],
+                     User)
+    assert users == [User('Jimmy', 10)]
+    assert modelify({'a': 1}, None) == Bunch({'a': 1})
+
+
+def test_model_response(api, endpoints):
+    users = api.users.get(model=SlottedUser)
+    assert [user.name for user in users] == \
+        [user['name'] for user in endpoints['/users']['body']]
+    assert not hasattr(users[0], '__dict__')
+
+    api.user(model=SlottedUser)
+    assert api.user.get('jimmy').age == endpoints['/user/jimmy']['body']['age']
+
+    error = api.status_404_message.get(model=SlottedUser, silent=True)
+    assert error.message == endpoints['/status_404_message']['body']['message']
+
+
+def test_dataclass_model():
+    dataclasses = pytest.importorskip('dataclasses')
+    typing = pytest.importorskip('typing')
+    DataUser = dataclasses.make_dataclass('DataUser', [
+        ('kind', typing.ClassVar[str], 'user'),
+        ('name', str),
+        ('age', int, dataclasses.field(init=False, default=0)),
+    ])
+
+    user = modelify({'name': 'Jimmy', 'age': 10, 'kind': 'admin'}, DataUser)
+    assert user.name == 'Jimmy'
+    assert user.age == 0
+
+
+def test_columnize(monkeypatch):
+    monkeypatch.setattr(utils, 'numpy', None)
+    columns = columnize([{'a': 1, 'b': 'x'}, {'a': 2, 'c': 1.5}],
+                        {'a': 'int32'})
+    assert list(columns.keys()) == ['a', 'b', 'c']
+    assert columns.a.typecode == 'i'
+    assert list(columns.a) == [1, 2]
+    assert columns.b == ['x', None]
+    assert columns.c == [None, 1.5]
+    assert columnize([{'a': 1.5}, {'a': 2}]).a.typecode == 'd'
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_columnize_missing_values(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(utils, 'numpy', None)
+    records = [{'a': 1}, {'b': 2}]
+
+    columns = columnize(records, {'a': 'float64'})
+    assert columns.a[0] == 1
+    assert columns.a[1] != columns.a[1]
+    with pytest.raises(ValueError):
+        columnize(records, {'a': 'int32'})
+    with pytest.raises(ValueError):
+        columnize(records, {'b': 'no such dtype'})
+
+
+def test_columnize_objects():
+    numpy = pytest.importorskip('numpy')
+    columns = columnize([{'a': 1, 'b': [1, 2], 'c': 1},
+                         {'a': 'x', 'b': [3], 'c': 2.5},
+                         {'a': 2, 'b': [4, 5], 'c': 3}])
+    assert columns.a.dtype == object
+    assert list(columns.a) == [1, 'x', 2]
+    assert columns.b.shape == (3,)
+    assert list(columns.b) == [[1, 2], [3], [4, 5]]
+    assert columns.c.dtype == numpy.float64
+
+
+def test_columns_response(api, endpoints):
+    numpy = pytest.importorskip('numpy')
+    users = endpoints['/users']['body']
+    columns = api.users.get(columns={'age': 'float32'})
+    assert isinstance(columns.age, numpy.ndarray)
+    assert columns.age.dtype == numpy.float32
+    assert list(columns.name) == [user['name'] for user in users]
+
+
+def test_columns_config(api, endpoints):
+    api.users(columns={'age': 'int32'})
+    columns = api.users.get(columns=True)
+    assert list(columns.age) == [user['age']
+                                 for user in endpoints['/users']['body']]
+
+
 def test_run_from_ipython():
     assert getattr(__builtins__, '__IPYTHON__', False) == run_from_ipython()
 
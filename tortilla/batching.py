@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class BatchResult(object):
+    """The eventual result of a batched request."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._exception = None
+
+    def set(self, value=None, exception=None):
+        self._value = value
+        self._exception = exception
+        self._event.set()
+
+    def get(self):
+        self._event.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+
+class Batcher(object):
+    """Collects `GET` requests on the children of a :class:`Wrap` and
+    requests them together from the bulk endpoint of that wrap.
+
+    The first request waits `window` seconds for others to join, unless
+    `max_batch_size` requests are collected before that. Identical
+    requests are only requested once. The bulk endpoint is expected to
+    return a list of records identified by their `key` field.
+
+    :param wrap: The :class:`Wrap` of the bulk endpoint
+    :param param: The query parameter the identifiers are sent in
+    :param key: The field of a record that contains its identifier
+    :param separator: The separator of the identifiers in `param`
+    :param max_batch_size: The maximum amount of identifiers per request
+    :param window: The amount of seconds to collect requests for
+    :param unpack: (optional) Function that returns the list of records
+        from the bulk response, e.g. ``lambda r: r['items']``
+    """
+
+    def __init__(self, wrap, param='ids', key='id', separator=',',
+                 max_batch_size=100, window=0.005, unpack=None):
+        self.wrap = wrap
+        self.param = param
+        self.key = key
+        self.separator = separator
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.unpack = unpack
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+
+    def _take(self):
+        batch, self._pending = self._pending, OrderedDict()
+        return batch
+
+    def load(self, id):
+        """Requests the record identified by `id` as part of a batch.
+
+        :return: The record, or ``None`` when the bulk response didn't
+            contain it
+        """
+        batch = None
+        leader = False
+        with self._lock:
+            result = self._pending.get(id)
+            if result is None:
+                result = self._pending[id] = BatchResult()
+                if len(self._pending) >= self.max_batch_size:
+                    batch = self._take()
+                else:
+                    leader = len(self._pending) == 1
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                # the batch is already gone when it filled up in the meantime
+                if self._pending.get(id) is result:
+                    batch = self._take()
+
+        if batch:
+            self._dispatch(batch)
+        return result.get()
+
+    def _dispatch(self, batch):
+        found = {}
+        # stays set when the dispatch is interrupted by a BaseException
+        error = RuntimeError('The batched request was interrupted')
+        try:
+            ids = self.separator.join(str(id) for id in batch)
+            response = self.wrap.get(params={self.param: ids})
+            records = self.unpack(response) if self.unpack else response
+            for record in records or ():
+                if isinstance(record, dict):
+                    found[str(record[self.key])] = record
+                else:
+                    found[str(getattr(record, self.key))] = record
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            # every waiting request gets a result, or the error
+            for id, result in batch.items():
+                if error is not None:
+                    result.set(exception=error)
+                else:
+                    result.set(found.get(str(id)))
+
+
+def batch(wrap, param='ids', key='id', **options):
+    """Turns `wrap` into a bulk endpoint for the `GET` requests of its
+    children.
+
+    Requests made at roughly the same time are deduplicated and sent as
+    a single request with their identifiers in the `param` query
+    parameter. Each record in the response is returned to the request
+    matching its `key` field.
+
+    Usage::
+
+        from tortilla.batching import batch
+
+        batch(api.items, param='ids', key='id')
+
+        # requested together as GET /items?ids=1,2
+        api.items(1).get()
+        api.items(2).get()
+
+    Only `GET` requests without extra options are batched.
+
+    :param wrap: The :class:`~tortilla.wrappers.Wrap` of the bulk endpoint
+    :param param: The query parameter the identifiers are sent in
+    :param key: The field of a record that contains its identifier
+    :param options: (optional) Arguments accepted by the
+        :class:`Batcher` initializer
+    :return: `wrap`
+    """
+    wrap._batcher = Batcher(wrap, param=param, key=key, **options)
+    return wrap
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import os
+import threading
+import uuid
+from collections import OrderedDict
 from time import time
 
 try:
@@ -12,19 +16,33 @@ class CacheWrapper(object):
     def __init__(self, cache):
         self.cache = cache
 
-    def has(self, key):
+    def entry(self, key):
+        """Returns the raw, unexpired cache entry of `key` or ``None``."""
         data = self.cache.get(key)
-        return data and time() < data['expires_on']
+        if data and time() < data['expires_on']:
+            return data
+        return None
+
+    def has(self, key):
+        data = self.entry(key)
+        return data is not None and 'value' in data
 
     def get(self, key, default=None):
-        if self.has(key):
-            return self.cache.get(key)['value']
+        data = self.entry(key)
+        if data is not None and 'value' in data:
+            return data['value']
         return default
 
     def set(self, key, value, lifetime=60):
         return self.cache.set(key, {'value': value,
                                     'expires_on': time() + lifetime})
 
+    def set_error(self, key, error, lifetime=60):
+        """Stores a negative result. `error` holds the bare response
+        details needed to replay it."""
+        return self.cache.set(key, {'error': error,
+                                    'expires_on': time() + lifetime})
+
     def delete(self, key):
         return self.cache.delete(key)
 
@@ -93,3 +111,123 @@ class RedisCache(BaseCache):
 
     def clear(self):
         self._redis.delete(self.namespace)
+
+
+class TieredCache(BaseCache):
+    """Puts a small in-process LRU cache (L1) in front of a shared cache
+    (L2) such as :class:`RedisCache`.
+
+    Reads go through L1 first and fill it from L2, writes go to both.
+    Items are kept in L1 for at most `lifetime` seconds, or shorter when
+    the item itself expires earlier.
+
+    When a `redis` client is given, changes are published on `channel`
+    so that other processes evict the item from their L1 as well. A
+    cache created before `os.fork` listens again in the child process.
+    """
+
+    def __init__(self, cache, maxsize=256, lifetime=5, redis=None,
+                 channel='python.tortilla.cache.invalidate'):
+        self.cache = cache
+        self.maxsize = maxsize
+        self.lifetime = lifetime
+        self.channel = channel
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis
+        self._listener = None
+        self._listen()
+
+    def _listen(self):
+        self._id = uuid.uuid4().hex
+        self._pid = os.getpid()
+        if self._redis is not None:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_invalidate})
+            self._listener = pubsub.run_in_thread(sleep_time=0.1,
+                                                  daemon=True)
+
+    def _check_fork(self):
+        # the listener thread doesn't survive a fork, and the lock may
+        # have been held by another thread of the parent
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._listen()
+
+    def _local_get(self, key):
+        self._check_fork()
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return None
+            expires_on, value = item
+            if time() >= expires_on:
+                return None
+            # reinsert to mark the item as most recently used
+            self._items[key] = item
+            return value
+
+    def _local_set(self, key, value):
+        expires_on = time() + self.lifetime
+        if isinstance(value, dict) and 'expires_on' in value:
+            expires_on = min(expires_on, value['expires_on'])
+        self._check_fork()
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (expires_on, value)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def _local_delete(self, key=None):
+        self._check_fork()
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+    def _publish(self, key=None):
+        if self._redis is not None:
+            self._redis.publish(self.channel, json.dumps([self._id, key]))
+
+    def _on_invalidate(self, message):
+        sender, key = json.loads(message['data'])
+        if sender != self._id:
+            self._local_delete(key)
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        local_key = json.dumps(key)
+        value = self._local_get(local_key)
+        if value is not None:
+            return value
+        value = self.cache.get(key)
+        if value is None:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value)
+        local_key = json.dumps(key)
+        self._local_set(local_key, value)
+        self._publish(local_key)
+
+    def delete(self, key):
+        local_key = json.dumps(key)
+        self._local_delete(local_key)
+        self.cache.delete(key)
+        self._publish(local_key)
+
+    def clear(self):
+        self._local_delete()
+        self.cache.clear()
+        self._publish()
+
+    def close(self):
+        """Stops listening for invalidations of other processes."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
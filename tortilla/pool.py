@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import os
+import threading
+import time
+
+import six
+from six.moves.urllib.parse import urlsplit
+
+
+def freeze(value):
+    """Returns a hashable representation of an option value.
+
+    Dictionaries, lists and sets are frozen by their contents, so equal
+    options share a client. Other values that can't be hashed are
+    identified by their identity.
+    """
+    if isinstance(value, dict):
+        return dict, frozenset((key, freeze(item))
+                               for key, item in six.iteritems(value))
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return set, frozenset(freeze(item) for item in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return id(value)
+
+
+class ClientPool(object):
+    """A registry of :class:`~tortilla.wrappers.Client` objects which are
+    shared by wraps of the same host with the same options.
+
+    Shared clients share their connections, cache and request delay.
+
+    Usage::
+
+        pool = ClientPool()
+        users = tortilla.wrap('https://api.example.org/users', pool=pool)
+        teams = tortilla.wrap('https://api.example.org/teams', pool=pool)
+
+        assert users._parent is teams._parent
+
+        # at shutdown
+        pool.close(timeout=10)
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # the lock may have been held by another thread of the parent
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+    def key(self, url, **options):
+        parts = urlsplit(url)
+        return ((parts.scheme, parts.netloc),
+                tuple(sorted((name, freeze(value))
+                             for name, value in six.iteritems(options))))
+
+    def client(self, url, **options):
+        """Returns the client for the host of `url` and `options`,
+        creating it when it doesn't exist yet."""
+        from .wrappers import Client
+
+        key = self.key(url, **options)
+        self._check_fork()
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = Client(**options)
+        return client
+
+    def clients(self):
+        self._check_fork()
+        with self._lock:
+            return list(self._clients.values())
+
+    def close(self, timeout=None):
+        """Closes all clients after their requests in progress finished
+        and empties the pool.
+
+        :param timeout: (optional) The maximum amount of seconds to wait
+            for the requests in progress of all clients together
+        :return: ``True`` when all requests in progress finished
+        """
+        self._check_fork()
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        drained = True
+        for client in clients:
+            remaining = None if deadline is None else \
+                max(deadline - time.time(), 0)
+            drained = client.close(timeout=remaining) and drained
+        return drained
+
+
+#: The process-level pool used by wraps created with ``pool=True``
+default_pool = ClientPool()
+
+atexit.register(default_pool.close, timeout=5)
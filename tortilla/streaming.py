@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from .utils import Bunch
+
+
+#: The amount of bytes read or written at once when streaming
+CHUNK_SIZE = 64 * 1024
+
+
+def is_stream(data):
+    """Checks whether `data` is a file object, iterator or memoryview
+    that should be sent as-is instead of being composed."""
+    if hasattr(data, 'read') or isinstance(data, memoryview):
+        return True
+    return hasattr(data, '__next__') or hasattr(data, 'next')
+
+
+def stream_size(data):
+    """Returns the amount of bytes left in `data` or ``None`` when it
+    isn't known."""
+    if isinstance(data, memoryview):
+        if hasattr(data, 'nbytes'):
+            return data.nbytes
+        # Python 2 memoryviews have no `nbytes`
+        size = data.itemsize
+        for length in data.shape:
+            size *= length
+        return size
+    try:
+        position = data.tell()
+        data.seek(0, os.SEEK_END)
+        size = data.tell() - position
+        data.seek(position)
+        return size
+    except (AttributeError, IOError, ValueError):
+        return None
+
+
+def iter_chunks(data, chunk_size=CHUNK_SIZE):
+    """Yields the chunks of a file object or iterator."""
+    if hasattr(data, 'read'):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in data:
+            yield chunk
+
+
+def track(chunks, progress, total=None):
+    """Calls `progress` with the amount of transferred bytes and the
+    `total` after every chunk."""
+    transferred = 0
+    for chunk in chunks:
+        transferred += len(chunk)
+        yield chunk
+        progress(transferred, total)
+
+
+class StreamReader(object):
+    """A file-like view of a file object or memoryview of a known size.
+
+    Its length lets requests and httpx send a `Content-Length` header
+    instead of using chunked transfer encoding.
+    """
+
+    def __init__(self, data, size, progress=None):
+        if isinstance(data, memoryview):
+            if data.ndim != 1 or data.itemsize != 1:
+                if hasattr(data, 'cast'):
+                    data = data.cast('B')
+                else:
+                    # Python 2 memoryviews can't be cast, so are copied
+                    data = memoryview(data.tobytes())
+            self._start = 0
+        else:
+            self._start = data.tell()
+        self._data = data
+        self._size = size
+        self._progress = progress
+        self._position = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._size
+        if not isinstance(self._data, memoryview):
+            self._data.seek(self._start + offset)
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        remaining = self._size - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if isinstance(self._data, memoryview):
+            chunk = self._data[self._position:self._position + size].tobytes()
+        else:
+            chunk = self._data.read(size)
+        self._position += len(chunk)
+        if self._progress is not None and chunk:
+            self._progress(self._position, self._size)
+        return chunk
+
+
+def request_body(data, progress=None):
+    """Prepares streamed request data.
+
+    File objects of a known size and memoryviews are sent with a
+    `Content-Length`. Other file objects and iterators are sent in
+    chunks.
+    """
+    size = stream_size(data)
+    if size is not None:
+        return StreamReader(data, size, progress)
+    if progress is None:
+        return data
+    return track(iter_chunks(data), progress)
+
+
+def download(response, sink, progress=None, chunk_size=CHUNK_SIZE):
+    """Writes the response body chunk by chunk to `sink`.
+
+    :param response: A streamed `requests.Response`
+    :param sink: A file object or a function accepting each chunk
+    :param progress: (optional) Function called with the amount of
+        received bytes and the total amount of bytes, or ``None`` when
+        the size of the response isn't known
+    :return: :class:`Bunch` with the `status_code`, the amount of
+        `bytes`, the `seconds` it took and the `rate` in bytes per second
+    """
+    write = getattr(sink, 'write', sink)
+    total = response.headers.get('Content-Length')
+    if total is not None:
+        total = int(total)
+
+    start = time.time()
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            write(chunk)
+            received += len(chunk)
+            if progress is not None:
+                progress(received, total)
+    finally:
+        response.close()
+    seconds = time.time() - start
+
+    return Bunch({
+        'status_code': response.status_code,
+        'bytes': received,
+        'seconds': seconds,
+        'rate': received / seconds if seconds > 0 else None,
+    })
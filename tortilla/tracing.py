@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+
+class Span(object):
+    """Records the duration of a phase of a request."""
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.spans.append((self.name, self.start,
+                                 time.time() - self.start))
+
+
+class Trace(object):
+    """The phases of a single request, e.g. 'network' or 'parse'."""
+
+    def __init__(self, tracer, method, url):
+        self.tracer = tracer
+        self.method = method.upper()
+        self.url = url
+        self.status_code = None
+        self.start = time.time()
+        self.duration = None
+        self.spans = []
+
+    def span(self, name):
+        return Span(self, name)
+
+    def finish(self):
+        self.duration = time.time() - self.start
+        self.tracer.record(self)
+
+    def phases(self):
+        """Returns the total amount of seconds spent per phase."""
+        phases = {}
+        for name, _, duration in self.spans:
+            phases[name] = phases.get(name, 0.0) + duration
+        return phases
+
+    def __repr__(self):
+        return "<{} {} {} ({:.3f}s)>".format(
+            self.__class__.__name__, self.method, self.url,
+            self.duration or 0.0)
+
+
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullTrace(object):
+    """Stands in for :class:`Trace` when a request isn't traced."""
+
+    url = None
+    status_code = None
+
+    def span(self, name):
+        return NULL_SPAN
+
+    def finish(self):
+        pass
+
+
+NULL_SPAN = NullSpan()
+NULL_TRACE = NullTrace()
+
+
+class Tracer(object):
+    """Traces a sampled fraction of requests and keeps the slowest.
+
+    Usage::
+
+        tracer = Tracer(sample_rate=0.1, slowest=20)
+        api = tortilla.wrap('https://api.example.org', tracer=tracer)
+
+        for trace in tracer.slowest():
+            print(trace, trace.phases())
+
+    :param sample_rate: The fraction of requests to trace
+    :param slowest: The amount of slowest traces to keep
+    """
+
+    def __init__(self, sample_rate=1.0, slowest=10):
+        self.sample_rate = sample_rate
+        self.max_traces = slowest
+        self._traces = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self, method, url):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return NULL_TRACE
+        return Trace(self, method, url)
+
+    def record(self, trace):
+        # a min-heap, so the fastest of the kept traces is dropped first
+        item = (trace.duration, next(self._counter), trace)
+        with self._lock:
+            if len(self._traces) < self.max_traces:
+                heapq.heappush(self._traces, item)
+            else:
+                heapq.heappushpop(self._traces, item)
+
+    def slowest(self):
+        """Returns the kept traces, slowest first."""
+        with self._lock:
+            traces = sorted(self._traces, reverse=True)
+        return [trace for _, _, trace in traces]
+
+    def clear(self):
+        with self._lock:
+            self._traces = []
+
+    def export(self, fp=None):
+        """Exports the kept traces in the Chrome trace event format,
+        which can be loaded in ``chrome://tracing`` or Perfetto.
+
+        :param fp: (optional) File object the JSON is written to
+        :return: The trace events as a ``dict``
+        """
+        events = []
+        pid = os.getpid()
+        for tid, trace in enumerate(self.slowest()):
+            events.append({
+                'name': '{} {}'.format(trace.method, trace.url),
+                'cat': 'request',
+                'ph': 'X',
+                'ts': trace.start * 1e6,
+                'dur': trace.duration * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': {'status_code': trace.status_code},
+            })
+            for name, start, duration in trace.spans:
+                events.append({
+                    'name': name,
+                    'cat': 'phase',
+                    'ph': 'X',
+                    'ts': start * 1e6,
+                    'dur': duration * 1e6,
+                    'pid': pid,
+                    'tid': tid,
+                })
+        result = {'traceEvents': events}
+        if fp is not None:
+            json.dump(result, fp)
+        return result
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import requests
+import six
+
+try:
+    import h2  # noqa: F401, required by httpx for HTTP/2
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def http2_session(verify=True, cert=None, proxies=None, max_connections=10):
+    """Returns a session which multiplexes requests over HTTP/2.
+
+    Falls back to a regular HTTP/1.1 :class:`requests.Session` when
+    `httpx` or `h2` isn't installed.
+    """
+    if httpx is None:
+        return requests.session()
+    return HTTP2Session(verify=verify, cert=cert, proxies=proxies,
+                        max_connections=max_connections)
+
+
+class HTTP2Session(object):
+    """A minimal `requests.Session` lookalike backed by an HTTP/2
+    enabled `httpx.Client`.
+
+    Concurrent requests to the same host share a few connections instead
+    of opening one connection per request. Servers that don't support
+    HTTP/2 are spoken to in HTTP/1.1.
+
+    The `verify`, `cert` and `proxies` options apply to the whole
+    session. Passing different values with a single request raises a
+    `ValueError`, and so do `hooks`. Like requests, there is no timeout
+    unless one is given.
+
+    :param transport: (optional) The `httpx` transport to use instead
+        of connecting to the network, e.g. an `httpx.MockTransport`
+    """
+
+    def __init__(self, verify=True, cert=None, proxies=None,
+                 max_connections=10, transport=None):
+        self.verify = verify
+        self.cert = cert
+        self.proxies = proxies
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            mounts = None
+            if self.proxies:
+                mounts = dict(
+                    (proxy_pattern(scheme), httpx.HTTPTransport(
+                        http2=True, verify=self.verify, cert=self.cert,
+                        proxy=httpx.Proxy(url)))
+                    for scheme, url in six.iteritems(self.proxies))
+            self._client = httpx.Client(
+                http2=True, verify=self.verify, cert=self.cert,
+                mounts=mounts, transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_connections))
+        return self._client
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                cookies=None, files=None, auth=None, timeout=None,
+                allow_redirects=True, proxies=None, hooks=None,
+                stream=False, verify=None, cert=None, json=None):
+        for name, value in (('verify', verify), ('cert', cert),
+                            ('proxies', proxies)):
+            if value is not None and value != getattr(self, name):
+                raise ValueError('`{}` can only be set for the whole '
+                                 'session when using HTTP/2'.format(name))
+        if hooks:
+            raise ValueError('`hooks` are not supported when using HTTP/2')
+
+        kwargs = {}
+        if isinstance(data, dict):
+            kwargs['data'] = data
+        elif data is not None:
+            kwargs['content'] = data
+        if isinstance(auth, requests.auth.HTTPBasicAuth):
+            auth = (auth.username, auth.password)
+        if isinstance(timeout, tuple):
+            # requests accepts a (connect, read) tuple
+            connect, read = timeout
+            timeout = httpx.Timeout(None, connect=connect, read=read)
+        try:
+            request = self.client.build_request(
+                method.upper(), url, params=params, headers=headers,
+                cookies=cookies, files=files, json=json, timeout=timeout,
+                **kwargs)
+            r = self.client.send(request, auth=auth, stream=stream,
+                                 follow_redirects=allow_redirects)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e)
+        except httpx.ReadTimeout as e:
+            # not a ConnectionError, so the request isn't sent again
+            raise requests.exceptions.ReadTimeout(e)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e)
+        return to_requests_response(r, stream=stream)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+def proxy_pattern(scheme):
+    """Converts a key of the requests `proxies` option, e.g. 'https' or
+    'http://example.org', to an `httpx` mount pattern."""
+    if '://' in scheme:
+        return scheme
+    return scheme + '://'
+
+
+def to_requests_response(r, stream=False):
+    """Converts an `httpx.Response` to a `requests.Response` so that
+    responses behave the same regardless of the transport.
+
+    When `stream` is ``True``, the body is read while iterating over
+    the content of the returned response.
+    """
+    response = requests.Response()
+    response.status_code = r.status_code
+    response.reason = r.reason_phrase
+    response.url = str(r.url)
+    response.headers.update(r.headers)
+    response.encoding = r.encoding
+    if stream:
+        response.raw = StreamedBody(r)
+    else:
+        response._content = r.content
+    return response
+
+
+class StreamedBody(object):
+    """Exposes the body of a streamed `httpx.Response` the way
+    `requests.Response.iter_content` reads it."""
+
+    def __init__(self, response):
+        self._response = response
+
+    def stream(self, chunk_size, decode_content=True):
+        for chunk in self._response.iter_bytes(chunk_size):
+            yield chunk
+
+    def close(self):
+        self._response.close()
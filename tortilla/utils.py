@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
-import six
+import array
+from collections import OrderedDict
 
+import six
 from formats import FormatBank, discover_json, discover_yaml
 
 
@@ -10,6 +12,34 @@ formats = FormatBank()
 discover_json(formats, content_type='application/json')
 discover_yaml(formats, content_type='application/x-yaml')
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Python 2 has no 'q' typecode, but its 'l' is 64 bits on most platforms
+INT64_TYPECODE = 'q' if six.PY3 else 'l'
+UINT64_TYPECODE = 'Q' if six.PY3 else 'L'
+
+#: Typecodes of the `array` module used for NumPy dtype hints when
+#: NumPy isn't installed
+ARRAY_TYPECODES = {
+    'int8': 'b',
+    'uint8': 'B',
+    'int16': 'h',
+    'uint16': 'H',
+    'int32': 'i',
+    'uint32': 'I',
+    'int64': INT64_TYPECODE,
+    'uint64': UINT64_TYPECODE,
+    'float32': 'f',
+    'float64': 'd',
+    'int': INT64_TYPECODE,
+    'float': 'd',
+    'bool': 'B',
+}
+
 
 def run_from_ipython():
     return getattr(__builtins__, "__IPYTHON__", False)
@@ -31,3 +61,145 @@ def bunchify(obj):
     if isinstance(obj, dict):
         return Bunch(obj)
     return obj
+
+
+def model_fields(model):
+    """Returns the field names of a namedtuple, dataclass or a class
+    with `__slots__`, or ``None`` when they can't be determined.
+
+    Only dataclass fields accepted by `__init__` are returned.
+    """
+    fields = getattr(model, '_fields', None)
+    if fields is None and hasattr(model, '__dataclass_fields__'):
+        import dataclasses
+        fields = tuple(field.name for field in dataclasses.fields(model)
+                       if field.init)
+    if fields is None and hasattr(model, '__slots__'):
+        slots = model.__slots__
+        fields = (slots,) if isinstance(slots, six.string_types) else slots
+    return fields
+
+
+def modelify(obj, model):
+    """Decodes parsed data into instances of `model` in a single pass.
+
+    Dictionaries, or each dictionary in a list, are passed as keyword
+    arguments to `model`. Keys that aren't fields of the model are left
+    out. Without a model, the data is bunchified.
+    """
+    if model is None:
+        return bunchify(obj)
+    fields = model_fields(model)
+
+    def decode(item):
+        if not isinstance(item, dict):
+            return item
+        if fields is None:
+            return model(**item)
+        return model(**dict((field, item[field]) for field in fields
+                            if field in item))
+
+    if isinstance(obj, (list, tuple)):
+        return [decode(item) for item in obj]
+    return decode(obj)
+
+
+def to_array(values, dtype=None, name=None):
+    """Converts a list of values to a NumPy array, or to an `array.array`
+    when NumPy isn't installed.
+
+    Values without a `dtype` hint that aren't all numbers are kept as
+    they are, in an object array or, without NumPy, a list. Missing
+    values (``None``) in a column with a floating point hint become NaN.
+
+    :raises ValueError: When the `dtype` hint isn't supported, or when
+        the hint isn't a floating point type and values are missing
+    """
+    if dtype is None:
+        types = set(type(value) for value in values)
+        is_number = types and types <= set(six.integer_types + (float,))
+        if numpy is not None:
+            if is_number:
+                return numpy.array(values)
+            # assigned one by one, so nested lists aren't turned into
+            # extra dimensions
+            result = numpy.empty(len(values), dtype=object)
+            for index, value in enumerate(values):
+                result[index] = value
+            return result
+        if types and types <= set(six.integer_types):
+            return array.array(INT64_TYPECODE, values)
+        if is_number:
+            return array.array('d', values)
+        return values
+
+    if numpy is not None:
+        try:
+            dtype = numpy.dtype(dtype)
+        except TypeError:
+            raise ValueError('Unsupported dtype {!r} for column {!r}'
+                             .format(dtype, name))
+        is_float = dtype.kind in 'fc'
+    else:
+        typecode = ARRAY_TYPECODES.get(dtype, dtype)
+        if typecode not in ARRAY_TYPECODES.values():
+            raise ValueError('Unsupported dtype {!r} for column {!r} '
+                             'without NumPy'.format(dtype, name))
+        is_float = typecode in 'fd'
+
+    if None in values:
+        if not is_float:
+            raise ValueError('Column {!r} has missing values, which can '
+                             'only be stored with a floating point dtype'
+                             .format(name))
+        values = [float('nan') if value is None else value
+                  for value in values]
+
+    if numpy is not None:
+        return numpy.array(values, dtype=dtype)
+    return array.array(typecode, values)
+
+
+def columnize(obj, dtypes=None):
+    """Decodes a list of flat records into a :class:`Bunch` of column
+    arrays in a single pass.
+
+    Values missing from a record are filled with ``None``, or NaN in
+    columns with a floating point dtype hint.
+
+    :param obj: A list of dictionaries, or a single dictionary
+    :param dtypes: (optional) Dictionary of dtype hints per field,
+        e.g. ``{'age': 'int32'}``
+    """
+    if dtypes is None:
+        dtypes = {}
+    if isinstance(obj, dict):
+        obj = [obj]
+
+    columns = OrderedDict()
+    for index, record in enumerate(obj):
+        for key, value in six.iteritems(record):
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * index
+            column.append(value)
+        for column in columns.values():
+            if len(column) <= index:
+                column.append(None)
+
+    # `Bunch.update` is used because it doesn't bunchify the columns
+    result = Bunch()
+    result.update((key, to_array(column, dtypes.get(key), key))
+                  for key, column in six.iteritems(columns))
+    return result
+
+
+def decode(obj, model=None, columns=None):
+    """Decodes parsed data into columns when `columns` is set, or into
+    models or bunches otherwise.
+
+    :param columns: ``True`` or a dictionary of dtype hints per field
+    """
+    if columns:
+        return columnize(obj, None if columns is True else columns)
+    return modelify(obj, model)
@@ -3,15 +3,18 @@
 from __future__ import unicode_literals
 
 import os
+import threading
 import time
 
 import requests
 import six
 from colorama import Fore, Style, init as init_colorama
 
-from . import formatters
+from . import formatters, streaming, transports
+from .pool import default_pool
+from .tracing import NULL_TRACE
 from .cache import CacheWrapper, DictCache
-from .utils import formats, run_from_ipython, Bunch, bunchify
+from .utils import formats, run_from_ipython, Bunch, bunchify, decode
 
 try:
     import OpenSSL
@@ -62,6 +65,17 @@ debug_messages = {
 DEBUG_MAX_TEXT_LENGTH = 100
 
 
+def restore_response(error):
+    """Rebuilds a `requests.Response` from a cached negative result."""
+    response = requests.Response()
+    response.status_code = error['status_code']
+    response.reason = error['reason']
+    response.url = error['url']
+    response.encoding = 'utf-8'
+    response._content = error['text'].encode('utf-8')
+    return response
+
+
 if os.name == 'nt' and run_from_ipython():
     # IPython stops working properly when it loses control of
     # `stdout` on Windows. In this case we won't enable Windows
@@ -75,14 +89,28 @@ else:
 class Client(object):
     """Wrapper around the most basic methods of the requests library."""
 
-    def __init__(self, debug=False, cache=None, **kwargs):
+    def __init__(self, debug=False, cache=None, http2=False, tracer=None,
+                 **kwargs):
         self.headers = Bunch()
         self.debug = debug
         self.cache = cache if cache else DictCache()
         self.cache = CacheWrapper(self.cache)
-        self.session = requests.session()
-        self._last_request_time = None
+        self.http2 = http2
         self.defaults = kwargs
+        self.session = self._create_session()
+        self._pid = os.getpid()
+        self._last_request_time = None
+        self._active_requests = 0
+        self._activity = threading.Condition()
+        self.tracer = tracer
+
+    def _create_session(self):
+        if self.http2:
+            return transports.http2_session(
+                verify=self.defaults.get('verify', True),
+                cert=self.defaults.get('cert'),
+                proxies=self.defaults.get('proxies'))
+        return requests.session()
 
     def _log(self, message, debug=None, **kwargs):
         """Outputs a formatted message in the console if the
@@ -99,20 +127,46 @@ class Client(object):
         if display_log:
             print(message.format(**kwargs))
 
+    def _check_fork(self):
+        """Starts over in a child process after `os.fork`.
+
+        The connections of a session created before the fork are shared
+        with the parent process. The lock and counter of the requests in
+        progress are copied in whatever state another thread of the
+        parent left them.
+        """
+        if self._pid != os.getpid():
+            self.session = self._create_session()
+            self._active_requests = 0
+            self._activity = threading.Condition()
+            self._pid = os.getpid()
+
     def send_request(self, *args, **kwargs):
         """Wrapper for session.request
         Handle connection reset error even from pyopenssl
+
+        Streamed request data is rewound before retrying. When that's not
+        possible, e.g. for generators, the error is raised instead.
         """
+        self._check_fork()
+        data = kwargs.get('data')
+        position = None
+        if streaming.is_stream(data):
+            try:
+                position = data.tell()
+            except (AttributeError, IOError, ValueError):
+                position = None
         try:
             return self.session.request(*args, **kwargs)
         except ConnectionError:
             self.session.close()
+            if streaming.is_stream(data):
+                if position is None:
+                    raise
+                data.seek(position)
             return self.session.request(*args, **kwargs)
 
-    def request(self, method, url, path=(), extension=None, suffix=None,
-                params=None, headers=None, data=None, debug=None,
-                cache_lifetime=None, silent=None, ignore_cache=False,
-                format='json', delay=0.0, formatter=None, **kwargs):
+    def request(self, method, url, *args, **kwargs):
         """Requests a URL and returns a *Bunched* response.
 
         This method basically wraps the request method of the requests
@@ -130,7 +184,8 @@ class Client(object):
         :param params: (optional) The URL query parameters
         :param headers: (optional) Extra headers to sent with the request.
             Existing header keys can be overwritten.
-        :param data: (optional) Dictionary
+        :param data: (optional) Dictionary, or a file object, iterator
+            or memoryview which is streamed as-is
         :param debug: (optional) Overwrite of `Client.debug`
         :param cache_lifetime: (optional) The amount of seconds that the
             response has to be cached for.
@@ -138,6 +193,28 @@ class Client(object):
             from HTTP status codes or parsing will be ignored.
         :param ignore_cache: (optional) When ``True``, a previously
             cached response of the same request will be ignored.
+        :param error_cache_lifetime: (optional) The amount of seconds that
+            negative results of `GET` requests have to be cached for.
+            May also be a ``dict`` mapping a status code (``404``), a
+            status class (``'4xx'``), an empty body (``'empty'``) or an
+            unparsable body (``'invalid'``) to its own lifetime. Cached
+            negative results raise the same exception, or return ``None``
+            when `silent`, without requesting the URL again.
+        :param model: (optional) A namedtuple, dataclass or other class
+            the response, or each item of a list response, is decoded
+            into instead of a :class:`Bunch`.
+        :param columns: (optional) When ``True``, a list of flat records
+            is decoded into a :class:`Bunch` of column arrays. NumPy
+            arrays are used when available. May also be a ``dict`` of
+            dtype hints per field, e.g. ``{'age': 'int32'}``.
+        :param raw: (optional) When ``True``, the response body is
+            returned as bytes instead of being parsed.
+        :param sink: (optional) A file object or function the response
+            body is streamed to chunk by chunk. The transfer statistics
+            are returned instead of the response.
+        :param progress: (optional) Function called with the amount of
+            transferred bytes and the total amount of bytes, or ``None``
+            when unknown, while streaming `data` and the response.
         :param format: (optional) The type of request data to parse.
             May take the following values:
               - 'json', 'xml', ... both request data load and response are
@@ -151,6 +228,51 @@ class Client(object):
             the `requests.request` method
         :return: :class:`Bunch` object from JSON-parsed response
         """
+        self._check_fork()
+        with self._activity:
+            self._active_requests += 1
+        try:
+            if self.tracer is None:
+                return self._request(NULL_TRACE, method, url, *args, **kwargs)
+            trace = self.tracer.start(method, url)
+            try:
+                return self._request(trace, method, url, *args, **kwargs)
+            finally:
+                trace.finish()
+        finally:
+            with self._activity:
+                self._active_requests -= 1
+                self._activity.notify_all()
+
+    def close(self, timeout=None):
+        """Waits for the requests in progress to finish and closes the
+        connections of the session.
+
+        :param timeout: (optional) The maximum amount of seconds to wait
+            for the requests in progress
+        :return: ``True`` when no requests were in progress anymore
+        """
+        self._check_fork()
+        deadline = None if timeout is None else time.time() + timeout
+        with self._activity:
+            while self._active_requests:
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._activity.wait(remaining)
+            drained = not self._active_requests
+        self.session.close()
+        return drained
+
+    def _request(self, trace, method, url, path=(), extension=None,
+                 suffix=None, params=None, headers=None, data=None,
+                 debug=None, cache_lifetime=None, silent=None,
+                 ignore_cache=False, format='json', delay=0.0,
+                 formatter=None, error_cache_lifetime=None, model=None,
+                 columns=None, raw=False, sink=None, progress=None,
+                 **kwargs):
+        """Executes :meth:`request`, recording its phases in `trace`."""
         if debug is None:
             debug = self.debug
 
@@ -168,10 +290,14 @@ class Client(object):
         # add the 'Content-Type' header and compose data, only when:
         #   1. the content is actually sent (whatever the HTTP verb is used)
         #   2. the format is provided ('json' by default)
-        if request_format and (data is not None):
+        #   3. the data isn't streamed
+        if streaming.is_stream(data):
+            data = streaming.request_body(data, progress)
+        elif request_format and (data is not None):
             request_headers.setdefault(
                 'Content-Type', formats.meta(request_format).get('content_type'))
-            data = formats.compose(request_format, data)
+            with trace.span('compose'):
+                data = formats.compose(request_format, data)
 
         # form the URL
         if not hasattr(path, "encode"):
@@ -183,6 +309,7 @@ class Client(object):
         if suffix is None:
             suffix = ''
         url = '%s%s%s%s' % (url, path, extension, suffix)
+        trace.url = url
 
         # log a debug message about the request
         self._log(debug_messages['request'], debug, method=method.upper(),
@@ -190,34 +317,76 @@ class Client(object):
 
         # check if the response for this request is cached
         cache_key = (url, str(params), str(headers))
-        if self.cache.has(cache_key) and not ignore_cache:
-            item = self.cache.get(cache_key)
-            self._log(debug_messages['cached_response'], debug, text=item)
-            return bunchify(item)
-
-        # delay the request if needed
-        if delay > 0:
-            t = time.time()
-            if self._last_request_time is None:
-                self._last_request_time = t
-
-            elapsed = t - self._last_request_time
-            if elapsed < delay:
-                time.sleep(delay - elapsed)
-
-        # use default request parameters
-        for name, value in self.defaults.items():
-            kwargs.setdefault(name, value)
-
-        # execute the request
-        r = self.send_request(method, url, params=params,
-                              headers=request_headers, data=data, **kwargs)
-        self._last_request_time = time.time()
+        cached_error = None
+        streamed = raw or sink is not None
+        if not ignore_cache and not streamed:
+            with trace.span('cache'):
+                entry = self.cache.entry(cache_key)
+            if entry is not None and 'error' in entry:
+                cached_error = entry['error']
+            elif entry is not None:
+                item = entry['value']
+                self._log(debug_messages['cached_response'], debug, text=item)
+                with trace.span('decode'):
+                    return decode(item, model, columns)
+
+        if cached_error is not None:
+            # replay the cached negative result as if it was just received
+            self._log(debug_messages['cached_response'], debug,
+                      text=cached_error)
+            r = restore_response(cached_error)
+        else:
+            # delay the request if needed
+            if delay > 0:
+                t = time.time()
+                if self._last_request_time is None:
+                    self._last_request_time = t
+
+                elapsed = t - self._last_request_time
+                if elapsed < delay:
+                    with trace.span('delay'):
+                        time.sleep(delay - elapsed)
+
+            # use default request parameters
+            for name, value in self.defaults.items():
+                kwargs.setdefault(name, value)
+            if sink is not None:
+                kwargs['stream'] = True
+
+            # execute the request
+            with trace.span('network'):
+                r = self.send_request(method, url, params=params,
+                                      headers=request_headers, data=data,
+                                      **kwargs)
+            self._last_request_time = time.time()
+        trace.status_code = r.status_code
+
+        # negative results are only cached for GET requests that weren't
+        # replayed from the cache themselves, and never when streamed
+        if cached_error is not None or method.lower() != 'get' or streamed:
+            error_cache_lifetime = None
+
+        # cache HTTP errors before they are raised
+        error_cached = False
+        if r.status_code >= 400:
+            error_cached = self._cache_error(
+                cache_key, r, error_cache_lifetime,
+                r.status_code, '%dxx' % (r.status_code // 100))
 
         # when not silent, raise an exception for any HTTP status code >= 400
         if not silent:
+            if sink is not None and r.status_code >= 400:
+                # release the connection of the unread, streamed body
+                r.close()
             r.raise_for_status()
 
+        # raw responses are neither parsed nor cached
+        if sink is not None:
+            with trace.span('download'):
+                return streaming.download(r, sink, progress)
+        if raw:
+            return r.content
+
         try:
             # parse the response into something nice
             has_body = len(r.text) > 0
@@ -226,9 +395,16 @@ class Client(object):
                 #       Extract this into a different variable so that
                 #       `parsed_response` is not ambiguous.
                 parsed_response = 'No response'
+                if not error_cached:
+                    self._cache_error(cache_key, r, error_cache_lifetime,
+                                      'empty')
             else:
-                parsed_response = formats.parse(response_format, r.text)
+                with trace.span('parse'):
+                    parsed_response = formats.parse(response_format, r.text)
         except ValueError as e:
+            if not error_cached:
+                self._cache_error(cache_key, r, error_cache_lifetime,
+                                  'invalid')
             # we've failed, raise this stuff when not silent
             if len(r.text) > DEBUG_MAX_TEXT_LENGTH:
                 text = r.text[:DEBUG_MAX_TEXT_LENGTH] + '...'
@@ -242,9 +418,12 @@ class Client(object):
             raise e
 
         # cache the response if required
-        # only GET requests are cached
-        if cache_lifetime and cache_lifetime > 0 and method.lower() == 'get':
-            self.cache.set(cache_key, parsed_response, cache_lifetime)
+        # only successful GET requests with a body are cached, errors
+        # are left to `error_cache_lifetime`
+        if cache_lifetime and cache_lifetime > 0 and has_body and \
+                method.lower() == 'get' and r.status_code < 400:
+            with trace.span('cache'):
+                self.cache.set(cache_key, parsed_response, cache_lifetime)
 
         # print out a final debug message about the response of the request
         debug_message = 'success_response' if r.status_code == 200 else \
@@ -254,10 +433,48 @@ class Client(object):
                   text=parsed_response)
 
         # return our findings and try to make it a bit nicer
-        if has_body:
+        # error bodies returned when silent don't match the model
+        if has_body and r.status_code >= 400:
             return bunchify(parsed_response)
+        if has_body:
+            with trace.span('decode'):
+                return decode(parsed_response, model, columns)
         return None
 
+    def _cache_error(self, cache_key, response, error_cache_lifetime, *keys):
+        """Caches a negative result when `error_cache_lifetime` defines
+        a lifetime for it.
+
+        :param cache_key: The key the result is cached under
+        :param response: The response to cache
+        :param error_cache_lifetime: Either the amount of seconds every
+            negative result is cached for, or a ``dict`` mapping the
+            `keys` to their lifetime.
+        :param keys: Identifiers of the result from most to least specific,
+            e.g. ``404, '4xx'``
+        :return: ``True`` when the result was cached
+        """
+        lifetime = error_cache_lifetime
+        if isinstance(error_cache_lifetime, dict):
+            lifetime = None
+            for key in keys:
+                # JSON configured lifetimes can only use string keys
+                for candidate in (key, str(key)):
+                    if candidate in error_cache_lifetime:
+                        lifetime = error_cache_lifetime[candidate]
+                        break
+                if lifetime is not None:
+                    break
+        if lifetime and lifetime > 0:
+            self.cache.set_error(cache_key, {
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'url': response.url,
+                'text': response.text,
+            }, lifetime)
+            return True
+        return False
+
 
 class Wrap(object):
     """Represents a part of the wrapped URL.
@@ -267,19 +484,31 @@ class Wrap(object):
 
     The root of the chain should be a :class:`Client` object. When a new
     :class:`Wrap` object is created without a parent, it will create a
-    new :class:`Client` object which will act as the root.
+    new :class:`Client` object which will act as the root. When `pool` is
+    given, a :class:`Client` shared with other wraps of the same host and
+    options is taken from that :class:`~tortilla.pool.ClientPool`
+    instead, or from the process-level pool when `pool` is ``True``.
     """
 
     def __init__(self, part, parent=None, headers=None, params=None,
                  debug=None, cache_lifetime=None, silent=None,
                  extension=None, suffix=None, format=None, cache=None,
                  delay=None, hyphenate=False, mixedcase=False, camelcase=False,
-                 formatter=None, **kwargs):
+                 formatter=None, error_cache_lifetime=None, model=None,
+                 columns=None, pool=None, **kwargs):
         if not hasattr(part, "encode"):
             part = str(part)
         self._part = part[:-1] if part[-1:] == '/' else part
         self._url = None
-        self._parent = parent or Client(debug=debug, cache=cache, **kwargs)
+        if parent is None:
+            if pool is True:
+                pool = default_pool
+            if pool:
+                parent = pool.client(part, debug=debug, cache=cache,
+                                     **kwargs)
+            else:
+                parent = Client(debug=debug, cache=cache, **kwargs)
+        self._parent = parent
 
         if formatter is None:
             if hyphenate:
@@ -300,8 +529,12 @@ class Wrap(object):
             'format': format,
             'delay': delay,
             'formatter': formatter,
+            'error_cache_lifetime': error_cache_lifetime,
+            'model': model,
+            'columns': columns,
         })
         self._children = {}
+        self._batcher = None
 
     def url(self):
         if self._url:
@@ -383,6 +616,12 @@ class Wrap(object):
             return self.__call__(*parts).request(method=method, **options)
 
         else:
+            batcher = getattr(self._parent, '_batcher', None)
+            if batcher is not None and method == 'get' and not options:
+                # the parent collects plain GET requests of its children
+                # and requests them from its bulk endpoint
+                return batcher.load(self._part)
+
             if 'url' not in options:
                 # the last part constructs the URL
                 options['url'] = self.url()
@@ -390,13 +629,17 @@ class Wrap(object):
             for key, value in six.iteritems(self.config):
                 # set the defaults in the options
                 if value is not None:
-                    if isinstance(value, dict):
+                    option = options.get(key)
+                    if isinstance(value, dict) and \
+                            (option is None or isinstance(option, dict)):
                         # prevents overwriting default values in dicts
                         copy = value.copy()
-                        if options.get(key):
-                            copy.update(options[key])
+                        if option:
+                            copy.update(option)
                         options[key] = copy
                     else:
+                        # other values, e.g. a number replacing a dict
+                        # of lifetimes, take precedence as they are
                         options.setdefault(key, value)
 
             # at this point, we're ready to completely go down the chain